@@ -1,28 +1,38 @@
 import time
 import os
 import datetime
-import re
+import functools
+import json
+import logging
+import logging.handlers
+import queue
 from dotenv import load_dotenv
-from langchain_community.llms import Ollama
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.documents import Document
-from langchain_core.retrievers import BaseRetriever
 from typing import List, Dict, Any, Tuple
-from pydantic import Field
-import langdetect
-from langdetect.lang_detect_exception import LangDetectException
+from fast_langdetect import detect as fast_detect
+from fast_langdetect import DetectError
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import threading
+import numpy as np
+import tiktoken
+from collections import OrderedDict
 from deep_translator import GoogleTranslator
+import httpx
 
-from VectorTools import VectorDB
+from VectorTools import get_embedding, asimilarity_search, get_async_pool
 
 # Create a shared thread pool for blocking work
 thread_pool = ThreadPoolExecutor(max_workers=10)
 
+# Request-path logging goes through a queue to a background listener thread,
+# so concurrent queries never serialize on the stdout lock or flush syscalls.
+logger = logging.getLogger(__name__)
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+
 # Load environment variables from .env file
 load_dotenv()
 POSTGRESPASS = os.environ.get("POSTGRESPASS")
@@ -39,41 +49,286 @@ CONN_PARAMS = {
 # Thread-local storage for LLM instances
 thread_local = threading.local()
 
-# Global connection pool for database connections
-db_connection_pool = []
-db_pool_lock = threading.Lock()
-MAX_DB_CONNECTIONS = 10
-
-def get_db_connection():
-    """Get a database connection from the pool or create a new one."""
-    with db_pool_lock:
-        if db_connection_pool:
-            return db_connection_pool.pop()
-        else:
-            return VectorDB(CONN_PARAMS)
+def strip_think(text: str) -> str:
+    """
+    Remove <think>...</think> blocks from an answer. The tags are fixed
+    literals, so a find/slice loop beats spinning up the regex engine on
+    every response.
+    """
+    while True:
+        start = text.find("<think>")
+        if start == -1:
+            break
+        end = text.find("</think>", start)
+        if end == -1:
+            break
+        text = text[:start] + text[end + len("</think>"):]
+    return text.strip()
 
-def return_db_connection(vector_db):
-    """Return a database connection to the pool."""
-    with db_pool_lock:
-        if len(db_connection_pool) < MAX_DB_CONNECTIONS:
-            db_connection_pool.append(vector_db)
-        else:
-            vector_db.close() #Yeah
+class ThinkTagStripper:
+    """
+    Incrementally removes <think>...</think> blocks from a token stream so
+    stripping happens as tokens arrive instead of with a final pass over the
+    whole answer. Handles tags split across chunk boundaries.
+    """
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self.in_think = False
+        self.buffer = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return whatever text is safe to emit."""
+        self.buffer += chunk
+        output = []
+        while True:
+            if self.in_think:
+                end = self.buffer.find(self.CLOSE)
+                if end == -1:
+                    # Keep only a tail that could still be a partial close tag
+                    if len(self.buffer) >= len(self.CLOSE):
+                        self.buffer = self.buffer[-(len(self.CLOSE) - 1):]
+                    break
+                self.buffer = self.buffer[end + len(self.CLOSE):]
+                self.in_think = False
+            else:
+                start = self.buffer.find(self.OPEN)
+                if start == -1:
+                    # Emit everything except a possible partial open tag suffix
+                    keep = 0
+                    for k in range(min(len(self.OPEN) - 1, len(self.buffer)), 0, -1):
+                        if self.buffer.endswith(self.OPEN[:k]):
+                            keep = k
+                            break
+                    emit_len = len(self.buffer) - keep
+                    if emit_len:
+                        output.append(self.buffer[:emit_len])
+                        self.buffer = self.buffer[emit_len:]
+                    break
+                output.append(self.buffer[:start])
+                self.buffer = self.buffer[start + len(self.OPEN):]
+                self.in_think = True
+        return "".join(output)
+
+    def flush(self) -> str:
+        """Return any remaining emittable text at end of stream."""
+        remaining = "" if self.in_think else self.buffer
+        self.buffer = ""
+        return remaining
+
+def detect_language_code(query: str) -> str:
+    """
+    Detect the language code for a query using the FastText-based detector.
+    Truncates long queries to bound cost and falls back to English on failure.
+    """
+    try:
+        return fast_detect(query[:512], low_memory=True)["lang"]
+    except DetectError:
+        return "en"
 
-LLM_INSTANCE = Ollama(
-    model="qwen3:4b",  # quantized for speed
-    base_url="http://localhost:11434",
-    temperature=0.2,
-    top_p=0.95
+class SemanticCache:
+    """
+    Embedding-keyed response cache for process_query (GPTCache-style).
+    An exact-match dict gives free hits on repeated queries; otherwise the
+    query embedding is compared against all cached embeddings and any hit
+    with cosine similarity above the threshold returns the cached response,
+    skipping both the vector search and the LLM call.
+
+    Embeddings are computed on the translated English search query, so a
+    Spanish query and its English equivalent embed identically; similarity
+    hits are therefore restricted to entries cached under the same detected
+    language, otherwise a Spanish query could be answered in English.
+    """
+    def __init__(self, threshold: float = 0.95, max_size: int = 10000):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.embeddings = None  # (N, dim) matrix of normalized query embeddings
+        self.cache_ids = []     # row index -> cache id
+        self.languages = []     # row index -> detected language of the entry
+        self.responses = OrderedDict()  # cache id -> response dict (LRU order)
+        self.exact = {}         # raw query -> cache id
+        self.next_id = 0
+
+    def get(self, query: str, embedding: List[float] = None, language: str = None):
+        with self.lock:
+            # First level: exact match on the raw query string (the same
+            # string always detects the same language, so no check needed)
+            cache_id = self.exact.get(query)
+            if cache_id is not None and cache_id in self.responses:
+                self.responses.move_to_end(cache_id)
+                return dict(self.responses[cache_id])
+
+            # Second level: cosine similarity against cached embeddings,
+            # restricted to entries in the same language
+            if embedding is None or self.embeddings is None or len(self.cache_ids) == 0:
+                return None
+            query_vec = np.asarray(embedding, dtype=np.float32)
+            scores = self.embeddings @ query_vec  # embeddings are normalized
+            if language is not None:
+                valid = np.fromiter((lang == language for lang in self.languages),
+                                    dtype=bool, count=len(self.languages))
+                if not valid.any():
+                    return None
+                scores = np.where(valid, scores, -1.0)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                cache_id = self.cache_ids[best]
+                self.responses.move_to_end(cache_id)
+                return dict(self.responses[cache_id])
+            return None
+
+    def put(self, query: str, embedding: List[float], response: Dict[str, Any],
+            language: str = None):
+        with self.lock:
+            cache_id = self.next_id
+            self.next_id += 1
+            query_vec = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+            if self.embeddings is None:
+                self.embeddings = query_vec
+            else:
+                self.embeddings = np.vstack([self.embeddings, query_vec])
+            self.cache_ids.append(cache_id)
+            self.languages.append(language)
+            self.responses[cache_id] = dict(response)
+            self.exact[query] = cache_id
+
+            # LRU eviction once the cache is full
+            while len(self.responses) > self.max_size:
+                old_id, _ = self.responses.popitem(last=False)
+                row = self.cache_ids.index(old_id)
+                self.embeddings = np.delete(self.embeddings, row, axis=0)
+                del self.cache_ids[row]
+                del self.languages[row]
+                self.exact = {q: cid for q, cid in self.exact.items() if cid != old_id}
+
+# Global semantic cache shared across requests
+semantic_cache = SemanticCache()
+
+OLLAMA_MODEL = "qwen3:4b"  # quantized for speed
+OLLAMA_BASE_URL = "http://localhost:11434"
+
+# Micro-batch coalescer: Ollama slows down badly under naive concurrency, so
+# requests arriving within a small window are grouped and submitted together
+# through one AsyncClient, overlapping network and compute across users.
+# Remember to raise OLLAMA_NUM_PARALLEL on the Ollama server to match.
+BATCH_WINDOW_SECONDS = 0.008
+MAX_BATCH_SIZE = 8
+
+# Persistent HTTP/2 client for all Ollama calls: keep-alive connections and
+# stream multiplexing avoid a fresh TCP setup per generation under load.
+ollama_http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(
+        max_keepalive_connections=40,
+        max_connections=100,
+        keepalive_expiry=30.0
+    ),
+    timeout=httpx.Timeout(300.0, connect=10.0)
 )
 
-def create_prompt_template(language: str = "English") -> PromptTemplate:
+_generation_queue = None  # created lazily on the running event loop
+_batcher_task = None
+
+async def _generate_one(prompt: str) -> str:
+    response = await ollama_http_client.post(
+        f"{OLLAMA_BASE_URL}/api/generate",
+        json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "options": {"temperature": 0.2, "top_p": 0.95}
+        }
+    )
+    response.raise_for_status()
+    return response.json()["response"]
+
+# In-flight batch tasks, referenced so the event loop can't garbage-collect
+# them mid-generation
+_inflight_batches = set()
+
+async def _dispatch_batch(batch):
+    """Run one batch's generations together and resolve their futures."""
+    results = await asyncio.gather(
+        *(_generate_one(prompt) for prompt, _ in batch),
+        return_exceptions=True
+    )
+    for (_, future), result in zip(batch, results):
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+async def _generation_batcher():
+    """Drain the queue every few ms and run the grouped prompts together."""
+    loop = asyncio.get_event_loop()
+    while True:
+        batch = [await _generation_queue.get()]
+        deadline = loop.time() + BATCH_WINDOW_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_generation_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Bin by prompt length so short prompts aren't stuck behind long ones
+        batch.sort(key=lambda item: len(item[0]))
+
+        # Fire the batch and go straight back to draining the queue:
+        # awaiting it here would make every request arriving mid-batch
+        # wait for the whole batch to finish generating
+        task = asyncio.create_task(_dispatch_batch(batch))
+        _inflight_batches.add(task)
+        task.add_done_callback(_inflight_batches.discard)
+
+async def generate_llm_response(prompt: str) -> str:
+    """Submit a prompt to the coalescer and wait for its answer."""
+    global _generation_queue, _batcher_task
+    if _generation_queue is None:
+        _generation_queue = asyncio.Queue()
+        _batcher_task = asyncio.get_event_loop().create_task(_generation_batcher())
+
+    future = asyncio.get_event_loop().create_future()
+    await _generation_queue.put((prompt, future))
+    return await future
+
+async def generate_llm_stream(prompt: str):
+    """Yield response tokens from Ollama as they are generated."""
+    async with ollama_http_client.stream(
+        "POST",
+        f"{OLLAMA_BASE_URL}/api/generate",
+        json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": True,
+            "options": {"temperature": 0.2, "top_p": 0.95}
+        }
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                break
+
+def create_prompt_template(language: str = "English") -> str:
     """
-    Create a prompt template for the specified language.
-    This eliminates the need for separate PROMPT and SPANISH_PROMPT templates.
+    Create a prompt template string for the specified language with
+    {current_date}, {context} and {input} placeholders. A plain str.format
+    template skips the Pydantic validation LangChain's PromptTemplate paid
+    on every build.
     """
-    
-    return PromptTemplate.from_template(
+
+    return (
         f""""role": "You are an AI assistant for the Town of Earlham Iowa.
         You can provide information, answer questions and perform other tasks as needed.
         Today's date is {{current_date}}. Please be aware of this when discussing events, 
@@ -105,6 +360,36 @@ def create_prompt_template(language: str = "English") -> PromptTemplate:
         \nQuery: {{input}}\nAnswer:\n"""
     )
 
+@functools.lru_cache(maxsize=4096)
+def translate_es_to_en(query: str) -> str:
+    """
+    Translate a Spanish query to English. Cached on the raw query string so
+    repeated queries skip the network call entirely (translation-memory style).
+    """
+    return GoogleTranslator(source='es', target='en').translate(query)
+
+# strftime re-runs locale and weekday lookups per call, but the formatted
+# date only changes once a day
+_date_cache = {"day": None, "val": None}
+
+def today_str() -> str:
+    """Return today's date formatted for the prompt, cached per day."""
+    today = datetime.date.today()
+    if _date_cache["day"] != today:
+        _date_cache["day"] = today
+        _date_cache["val"] = today.strftime("%A, %B %d, %Y")
+    return _date_cache["val"]
+
+@functools.lru_cache(maxsize=8)
+def get_prompt_template(language: str, current_date: str) -> str:
+    """
+    Shared prompt template keyed on (language, date). Language has two values
+    and the date changes once a day, so the template string is assembled at
+    most twice a day instead of per request. The returned template still has
+    {context} and {input} placeholders.
+    """
+    return create_prompt_template(language).replace("{current_date}", current_date)
+
 def detect_language_and_translate(query: str) -> List[str]:
     """
     Detects if the query is in Spanish or English and translates if necessary.
@@ -113,166 +398,252 @@ def detect_language_and_translate(query: str) -> List[str]:
     - Second element is the English translation if Spanish, or the original query if English
     """
     start_time = time.time()
-    llm = LLM_INSTANCE
-    
-    # Create translate prompt template
-    translate_prompt = PromptTemplate.from_template(
-        "Translate the following Spanish text to English, keep the meaning and don't add any extra text, just the translation: {query}"
-    )
-    
-    try:
-        lang = langdetect.detect(query)
-    except LangDetectException:
-        lang = 'en'  # Default to English if detection fails
+    lang = detect_language_code(query)
 
     if lang == 'es':
         language = "Spanish"
-        # Translate from Spanish to English
-        translation_prompt = translate_prompt.format(query=query)
-        llm_start = time.time()
-        translation = llm.predict(translation_prompt).strip()
-        llm_end = time.time()
-        print(f"TIMING: Spanish translation LLM call took {llm_end - llm_start:.4f} seconds")
+        translation = translate_es_to_en(query)
     else:
         language = "English"
         translation = query
-    
+
     end_time = time.time()
-    print(f"TIMING: detect_language_and_translate took {end_time - start_time:.4f} seconds")
+    logger.debug("TIMING: detect_language_and_translate took %.4f seconds", end_time - start_time)
     return [language, translation]
 
-def create_rag_chain(documents: List[Document], language: str, current_date: str):
+# Context packing: prompt tokens are the dominant per-request LLM cost, so
+# retrieved chunks are filtered and fit into a fixed token budget before the
+# prompt is built.
+CONTEXT_TOKEN_BUDGET = 1200
+MIN_SIMILARITY_SCORE = 0.25
+
+_token_encoder = tiktoken.get_encoding("cl100k_base")
+
+def pack_context(results: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 min_score: float = MIN_SIMILARITY_SCORE) -> List[Dict]:
     """
-    Create a RAG chain for the specified language.
-    This consolidates the chain creation logic that was duplicated.
+    Greedily include retrieved chunks in score order until the token budget
+    is exhausted, truncating the last chunk to fit. Chunks scoring below the
+    similarity floor are dropped outright.
     """
-    llm = LLM_INSTANCE
-    prompt_template = create_prompt_template(language)
-    question_answer_chain = create_stuff_documents_chain(llm, prompt_template.partial(current_date=current_date))
-    retriever = SimpleRetriever(documents=documents)
-
-    return create_retrieval_chain(
-        retriever=retriever,
-        combine_docs_chain=question_answer_chain
-    )
+    packed = []
+    remaining = token_budget
+    for result in sorted(results, key=lambda r: r.get('score') or 0, reverse=True):
+        if (result.get('score') or 0) < min_score:
+            continue
+        tokens = _token_encoder.encode(result['content'])
+        if not tokens or remaining <= 0:
+            break
+        if len(tokens) > remaining:
+            truncated = dict(result)
+            truncated['content'] = _token_encoder.decode(tokens[:remaining])
+            packed.append(truncated)
+            break
+        packed.append(result)
+        remaining -= len(tokens)
+    return packed
 
 def extract_sources(results: List[Dict]) -> List[Dict]:
     """
-    Extract source information from search results.
-    This consolidates the source extraction logic.
+    Extract source information from search results, deduplicated by
+    (source, heading). The old if/else branches built the same dict, so the
+    only behavior kept from them is stopping once the Enactus Room Dataset
+    is included.
     """
+    seen = set()
     sources = []
     for result in results:
-        if result['metadata'].get('source') == 'Enactus Room Dataset.md':
-            source_info = {
-                "heading": result['metadata'].get('heading', 'Unknown Title'),
-                "source": result['metadata'].get('source', 'None'),
-                "url": result['metadata'].get('url', None),
-                "page": result['metadata'].get('page', None)
-            }
-            sources.append(source_info)
+        metadata = result['metadata']
+        key = (metadata.get('source'), metadata.get('heading'))
+        if key in seen:
+            continue
+        seen.add(key)
+        sources.append({
+            "heading": metadata.get('heading', 'Unknown Title'),
+            "source": metadata.get('source', 'None'),
+            "url": metadata.get('url'),
+            "page": metadata.get('page')
+        })
+        if metadata.get('source') == 'Enactus Room Dataset.md':
             break
-        else:
-            source_info = {
-                "heading": result['metadata'].get('heading', 'Unknown Title'),
-                "source": result['metadata'].get('source', 'None'),
-                "url": result['metadata'].get('url', None),
-                "page": result['metadata'].get('page', None)
-            }
-            sources.append(source_info)
     return sources
 
 async def process_query(query: str) -> Dict[str, Any]:
     start_time = time.time()
 
     try:
-        # Get database connection from pool
-        vector_db = get_db_connection()
-
         # 1️⃣ Language detection + translation (fast, in main loop)
         lang_start = time.time()
-        try:
-            lang = langdetect.detect(query)
-        except:
-            lang = "en"
+        lang = detect_language_code(query)
 
         if lang == "es":
             detected_language = "Spanish"
-            search_query = GoogleTranslator(source='es', target='en').translate(query)
+            # Run the translator's HTTP round-trip off the event loop and
+            # overlap it with warming the asyncpg pool instead of paying the
+            # two latencies back to back
+            search_query, _ = await asyncio.gather(
+                asyncio.to_thread(translate_es_to_en, query),
+                get_async_pool(CONN_PARAMS)
+            )
         else:
             detected_language = "English"
             search_query = query
         lang_end = time.time()
-        print(f"TIMING: Language detection+translation took {lang_end - lang_start:.4f} seconds")
+        logger.debug("TIMING: Language detection+translation took %.4f seconds", lang_end - lang_start)
+
+        loop = asyncio.get_event_loop()
+
+        # Semantic cache lookup: repeated/near-duplicate queries skip the
+        # vector search and LLM generation entirely
+        cache_start = time.time()
+        query_embedding = await loop.run_in_executor(
+            thread_pool, lambda: get_embedding(search_query)
+        )
+        cached = semantic_cache.get(query, embedding=query_embedding,
+                                    language=detected_language)
+        cache_end = time.time()
+        logger.debug("TIMING: Semantic cache lookup took %.4f seconds", cache_end - cache_start)
+        if cached is not None:
+            logger.debug("CACHE: Semantic cache hit, returning cached response")
+            return cached
 
         # Get current date for prompt
-        current_date = datetime.datetime.now().strftime("%A, %B %d, %Y")
+        current_date = today_str()
 
         # 2️⃣ Kick off vector search and prompt creation concurrently
-        loop = asyncio.get_event_loop()
 
-        vector_task = loop.run_in_executor(
-            thread_pool, lambda: vector_db.similarity_search(search_query, k=3)
+        vector_task = asyncio.create_task(
+            asimilarity_search(CONN_PARAMS, search_query, k=3, embedding=query_embedding)
         )
 
-        # Prepare prompt template while vector search runs
-        prompt_template = create_prompt_template(detected_language)
+        # Prepare prompt template while vector search runs (cached per language+date)
+        prompt_template = get_prompt_template(detected_language, current_date)
 
         # Wait for vector search results
         results = await vector_task
-        print(f"DEBUG: Vector similarity search returned {len(results)} results")
-
-        # 3️⃣ Process documents
-        sources = extract_sources(results)
-        documents = [
-            Document(page_content=r['content'][:1000], metadata=r['metadata'])
-            for r in results
-        ]
-
-        # 4️⃣ Create RAG chain
-        question_answer_chain = create_stuff_documents_chain(
-            LLM_INSTANCE,
-            prompt_template.partial(current_date=current_date)
-        )
-        retriever = SimpleRetriever(documents=documents)
-        rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+        logger.debug("Vector similarity search returned %d results", len(results))
 
-        # 5️⃣ Run LLM in thread pool (doesn’t block other users)
-        llm_task = loop.run_in_executor(
-            thread_pool, lambda: rag_chain.invoke({"input": search_query})
+        # 3️⃣ Process documents: pack the best chunks into the token budget
+        packed_results = pack_context(results)
+        sources = extract_sources(packed_results)
+
+        # 4️⃣ Build the final prompt from the retrieved context
+        context_str = "\n\n".join(r['content'] for r in packed_results)
+        prompt_str = prompt_template.format(
+            context=context_str,
+            input=search_query
         )
-        response = await llm_task
+
+        # 5️⃣ Submit to the micro-batch coalescer (groups concurrent users)
+        answer = await generate_llm_response(prompt_str)
+        response = {"answer": answer}
 
         # Remove <think>...</think> tags if present
         if response.get("answer"):
-            response["answer"] = re.sub(
-                r"<think>.*?</think>", "", response["answer"], flags=re.DOTALL
-            ).strip()
+            response["answer"] = strip_think(response["answer"])
 
         total_time = time.time() - start_time
-        print(f"TIMING: Total process_query took {total_time:.4f} seconds")
+        logger.debug("TIMING: Total process_query took %.4f seconds", total_time)
 
-        return {
+        result = {
             "answer": response.get("answer", ""),
             "sources": sources,
             "language_info": [detected_language, search_query]
         }
+        semantic_cache.put(query, query_embedding, result, language=detected_language)
+        return result
 
     except Exception as e:
-        print(f"ERROR: process_query failed after {time.time() - start_time:.4f} seconds")
-        print(f"DETAILS: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("process_query failed after %.4f seconds", time.time() - start_time)
         return {"error": str(e)}
 
-    finally:
-        return_db_connection(vector_db)
+async def process_query_stream(query: str):
+    """
+    Streaming variant of process_query. Yields {"type": "token"} events as
+    the LLM generates and a final {"type": "sources"} event, so the caller
+    sees time-to-first-token latency instead of time-to-last-token.
+    <think> tags are stripped incrementally as tokens arrive.
+    """
+    start_time = time.time()
+
+    try:
+        lang = detect_language_code(query)
+
+        if lang == "es":
+            detected_language = "Spanish"
+            search_query, _ = await asyncio.gather(
+                asyncio.to_thread(translate_es_to_en, query),
+                get_async_pool(CONN_PARAMS)
+            )
+        else:
+            detected_language = "English"
+            search_query = query
+
+        loop = asyncio.get_event_loop()
+
+        query_embedding = await loop.run_in_executor(
+            thread_pool, lambda: get_embedding(search_query)
+        )
+        cached = semantic_cache.get(query, embedding=query_embedding,
+                                    language=detected_language)
+        if cached is not None:
+            logger.debug("CACHE: Semantic cache hit, streaming cached response")
+            if cached.get("answer"):
+                yield {"type": "token", "content": cached["answer"]}
+            yield {
+                "type": "sources",
+                "sources": cached.get("sources", []),
+                "language_info": cached.get("language_info", [detected_language, search_query])
+            }
+            return
+
+        current_date = today_str()
+
+        vector_task = asyncio.create_task(
+            asimilarity_search(CONN_PARAMS, search_query, k=3, embedding=query_embedding)
+        )
+        prompt_template = get_prompt_template(detected_language, current_date)
+        results = await vector_task
+
+        packed_results = pack_context(results)
+        sources = extract_sources(packed_results)
+        context_str = "\n\n".join(r['content'] for r in packed_results)
+        prompt_str = prompt_template.format(
+            context=context_str,
+            input=search_query
+        )
+
+        stripper = ThinkTagStripper()
+        answer_parts = []
+        async for token in generate_llm_stream(prompt_str):
+            text = stripper.feed(token)
+            if text:
+                answer_parts.append(text)
+                yield {"type": "token", "content": text}
+        tail = stripper.flush()
+        if tail:
+            answer_parts.append(tail)
+            yield {"type": "token", "content": tail}
+
+        result = {
+            "answer": "".join(answer_parts).strip(),
+            "sources": sources,
+            "language_info": [detected_language, search_query]
+        }
+        semantic_cache.put(query, query_embedding, result, language=detected_language)
 
-class SimpleRetriever(BaseRetriever):
-    documents: List[Document] = Field(default_factory=list)
+        logger.debug("TIMING: Total process_query_stream took %.4f seconds",
+                     time.time() - start_time)
+        yield {
+            "type": "sources",
+            "sources": sources,
+            "language_info": [detected_language, search_query]
+        }
 
-    def _get_relevant_documents(self, query: str) -> List[Document]:
-        return self.documents
+    except Exception as e:
+        logger.exception("process_query_stream failed after %.4f seconds",
+                         time.time() - start_time)
+        yield {"type": "error", "error": str(e)}
 
 if __name__ == "__main__":
     # Test the query processing
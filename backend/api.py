@@ -1,8 +1,10 @@
 from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from Retrieve import process_query
+from Retrieve import process_query, process_query_stream
+import json
 from VectorTools import process_documents, VectorDB
 import time
 import os
@@ -281,6 +283,25 @@ async def my_query_endpoint(query: QueryRequest):
         # End tracking this query
         user_tracker.end_query(user_id)
 
+@app.post("/query/stream")
+async def my_query_stream_endpoint(query: QueryRequest):
+    """
+    Stream the answer as Server-Sent Events. Tokens arrive as they are
+    generated, so the user sees the first words immediately; sources are
+    sent as the final event.
+    """
+    user_id = str(uuid.uuid4())
+    user_tracker.start_query(user_id, query.query)
+
+    async def event_stream():
+        try:
+            async for event in process_query_stream(query.query):
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            user_tracker.end_query(user_id)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.post("/query/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = authenticate_user(fake_users_db, form_data.username, form_data.password)
@@ -337,27 +358,15 @@ async def upload_files(
         }
         vector_db = VectorDB(conn_params)
 
-        # Process documents
-        process_start_time = time.time()
-        processed_docs = process_documents(TEMP_DIR, category)
-        process_end_time = time.time()
-        print(f"TIMING: Document processing time: {process_end_time - process_start_time:.4f} seconds")
-
-        # Prepare documents and metadata for vector DB
-        documents = []
-        metadatas = []
-        for doc in processed_docs:
-            if hasattr(doc, 'page_content'):
-                documents.append(doc.page_content)
-            else:
-                documents.append(str(doc))
-            metadatas.append(doc.metadata)
-
-        # Add to vector DB
-        db_start_time = time.time()
-        vector_db.add_documents(documents, metadatas)
-        db_end_time = time.time()
-        print(f"TIMING: Database insertion time: {db_end_time - db_start_time:.4f} seconds")
+        # Process and insert documents in streamed batches so memory stays
+        # flat no matter how large the upload is
+        ingest_start_time = time.time()
+        chunks_added = 0
+        for batch_docs, batch_metas in process_documents(TEMP_DIR, category):
+            vector_db.add_documents(batch_docs, batch_metas)
+            chunks_added += len(batch_docs)
+        ingest_end_time = time.time()
+        print(f"TIMING: Document processing + insertion time: {ingest_end_time - ingest_start_time:.4f} seconds")
 
         upload_end_time = time.time()
         total_time = upload_end_time - upload_start_time
@@ -365,10 +374,10 @@ async def upload_files(
 
         return {
             "message": "Files processed and added to vector database successfully",
+            "chunks_added": chunks_added,
             "api_timing": {
                 "total_time": f"{total_time:.4f} seconds",
-                "processing_time": f"{process_end_time - process_start_time:.4f} seconds",
-                "db_insertion_time": f"{db_end_time - db_start_time:.4f} seconds"
+                "ingest_time": f"{ingest_end_time - ingest_start_time:.4f} seconds"
             }
         }
 
@@ -5,37 +5,11 @@ Utility script to identify and clean up corrupted DOCX files.
 
 import os
 import glob
-import zipfile
 from pathlib import Path
 
-def validate_docx_file(file_path):
-    """
-    Validate if a DOCX file is properly formatted by checking its ZIP structure.
-    
-    Parameters:
-    file_path (str): Path to the DOCX file to validate.
-    
-    Returns:
-    bool: True if file is valid, False otherwise.
-    """
-    try:
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Check if it contains the essential DOCX files
-            required_files = ['word/document.xml', '[Content_Types].xml']
-            file_list = zip_file.namelist()
-            
-            for required_file in required_files:
-                if required_file not in file_list:
-                    print(f"Missing required file in DOCX: {required_file}")
-                    return False
-            
-            return True
-    except zipfile.BadZipFile:
-        print(f"File is not a valid ZIP file (corrupted DOCX): {file_path}")
-        return False
-    except Exception as e:
-        print(f"Error validating DOCX file {file_path}: {str(e)}")
-        return False
+# Single shared implementation (magic-byte fast path included) lives in
+# VectorTools so both ingest and cleanup validate files the same way
+from VectorTools import validate_docx_file
 
 def scan_for_corrupted_files(directory):
     """
@@ -33,26 +33,14 @@ if __name__ == "__main__":
 
     category = input("What is the category of this data?/nEnter:")
 
-    processed_docs = process_documents(DOC_LOAD_DIR, category)
-
-    documents = []
-    metadatas = []
-
-    for doc in processed_docs:
-        # Extract the document content
-        if hasattr(doc, 'page_content'):
-            documents.append(doc.page_content)
-        else:
-            # Fall back to string representation if no page_content attribute
-            documents.append(str(doc))
-        
-        # Use the trimmed metadata we created
-        metadatas.append(doc.metadata)
-    
-    print(f"Prepared {len(documents)} documents for vector DB")
-    
-    # Add documents to vector DB
-    vector_db.add_documents(documents, metadatas)
+    # Stream batches straight into the vector DB: each batch is encoded,
+    # inserted and discarded, so memory stays flat for any corpus size
+    total_added = 0
+    for batch_docs, batch_metas in process_documents(DOC_LOAD_DIR, category):
+        vector_db.add_documents(batch_docs, batch_metas)
+        total_added += len(batch_docs)
+
+    print(f"Added {total_added} documents to vector DB")
 
     # Check final document count
     final_count = vector_db.get_document_count()
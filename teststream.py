@@ -0,0 +1,199 @@
+import asyncio
+import sys
+import time
+import aiohttp
+try:
+    # libuv-backed event loop: 2-4x higher socket throughput than the
+    # default selector loop, with no changes to the coroutines themselves.
+    # Not available on Windows, where the default loop is kept.
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+try:
+    # orjson parses in C, 2-5x faster per streamed token, and takes the
+    # raw bytes payload directly
+    import orjson as json
+except ImportError:
+    import json
+from langchain_community.llms import Ollama
+from langchain_core.prompts import PromptTemplate
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from typing import List
+from pydantic import Field
+
+API_URL = "http://localhost:8001/query/stream"
+
+class TokenSink:
+    """
+    Buffered stdout writer for streamed tokens. print(..., flush=True) per
+    token costs a write+flush syscall pair each time; batching output until
+    ~64 chars accumulate (or a newline arrives) collapses those syscalls
+    while still feeling live.
+    """
+    def __init__(self, threshold=64):
+        self.buf = ""
+        self.threshold = threshold
+
+    def write(self, text):
+        self.buf += text
+        if len(self.buf) >= self.threshold or "\n" in text:
+            self.flush()
+
+    def flush(self):
+        if self.buf:
+            sys.stdout.write(self.buf)
+            sys.stdout.flush()
+            self.buf = ""
+
+class SimpleRetriever(BaseRetriever):
+    documents: List[Document] = Field(default_factory=list)
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.documents
+
+def create_llm():
+    return Ollama(
+        model="qwen3:4b",
+        base_url="http://localhost:11434",
+        temperature=0.2,
+        top_p=0.95
+    )
+
+# Built once at import: chain construction triggers pydantic validation and
+# LangChain graph wiring, which is pure overhead to repeat per call
+LLM = create_llm()
+
+SIMPLE_CHAIN = PromptTemplate.from_template(
+    "You are an AI assistant for the Town of Earlham Iowa. Answer the query briefly.\nQuery: {input}\nAnswer:"
+) | LLM
+
+RAG_DOCUMENTS = [
+    Document(
+        page_content="Earlham is a small town in Madison County, Iowa.",
+        metadata={"source": "test"}
+    ),
+    Document(
+        page_content="The Earlham City Council meets on the first Monday of each month.",
+        metadata={"source": "test"}
+    )
+]
+
+RAG_CHAIN = create_retrieval_chain(
+    SimpleRetriever(documents=RAG_DOCUMENTS),
+    create_stuff_documents_chain(LLM, PromptTemplate.from_template(
+        "Answer using only this context:\n{context}\nQuery: {input}\nAnswer:"
+    ))
+)
+
+async def test_simple_streaming():
+    """Test streaming straight from the LLM with a simple prompt"""
+    print("\n=== Testing simple LLM streaming ===")
+    chain = SIMPLE_CHAIN
+
+    start_time = time.time()
+    total_len = 0
+    first_token_time = None
+    sink = TokenSink()
+
+    # astream keeps the event loop free while waiting on the LLM, so the
+    # gathered tests actually interleave instead of serializing
+    async for chunk in chain.astream({"input": "What is Earlham known for?"}):
+        if first_token_time is None:
+            first_token_time = time.time()
+            print(f"TIMING: First token after {first_token_time - start_time:.4f} seconds")
+        # A running length counter replaces `full_response += chunk`, which
+        # reallocates the whole string per token (O(N^2) overall)
+        total_len += len(chunk)
+        sink.write(chunk)
+
+    sink.flush()
+    print(f"\nTIMING: Full response ({total_len} chars) took {time.time() - start_time:.4f} seconds")
+
+async def test_rag_streaming():
+    """Test streaming through the retrieval chain with fake context documents"""
+    print("\n=== Testing RAG chain streaming ===")
+    rag_chain = RAG_CHAIN
+
+    start_time = time.time()
+    prev_len = 0
+    first_token_time = None
+    sink = TokenSink()
+
+    async for chunk in rag_chain.astream({"input": "When does the City Council meet?"}):
+        answer = chunk.get("answer", "")
+        if len(answer) <= prev_len:
+            continue
+        if first_token_time is None:
+            first_token_time = time.time()
+            print(f"TIMING: First token after {first_token_time - start_time:.4f} seconds")
+        # The chain re-sends the accumulated answer; a running length
+        # counter slices out just the unseen suffix without the O(N^2)
+        # per-chunk prefix comparison
+        sink.write(answer[prev_len:])
+        prev_len = len(answer)
+
+    sink.flush()
+    print(f"\nTIMING: Full response ({prev_len} chars) took {time.time() - start_time:.4f} seconds")
+
+async def test_streaming_api():
+    """Test the /query/stream SSE endpoint end to end"""
+    print("\n=== Testing streaming API endpoint ===")
+    start_time = time.time()
+    total_len = 0
+    first_token_time = None
+    sink = TokenSink()
+
+    async with aiohttp.ClientSession() as session:
+        async with session.post(API_URL, json={"query": "Tell me about City Council"}) as response:
+            response.raise_for_status()
+            # Frame the SSE stream at the bytes level: keepalives and blank
+            # lines are skipped without ever decoding to str, and only the
+            # JSON payload slice of data frames gets parsed
+            buf = bytearray()
+            async for data in response.content.iter_any():
+                buf += data
+                while (newline := buf.find(b"\n")) != -1:
+                    line = bytes(buf[:newline]).rstrip(b"\r")
+                    del buf[:newline + 1]
+                    if not line.startswith(b"data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if event.get("type") == "token":
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                            print(f"TIMING: First token after {first_token_time - start_time:.4f} seconds")
+                        total_len += len(event["content"])
+                        sink.write(event["content"])
+                    elif event.get("type") == "sources":
+                        sink.flush()
+                        print(f"\nSources: {event.get('sources')}")
+                    elif event.get("type") == "error":
+                        sink.flush()
+                        print(f"\nError from API: {event.get('error')}")
+
+    sink.flush()
+    print(f"TIMING: Full response ({total_len} chars) took {time.time() - start_time:.4f} seconds")
+
+async def _run_safely(test):
+    """Run one test, letting a failure log without cancelling its siblings."""
+    try:
+        await test()
+    except Exception as e:
+        print(f"\n{test.__name__} failed: {e}")
+
+async def main():
+    # Ollama handles multiple in-flight generations, so the two chain
+    # tests can run concurrently instead of back-to-back with sleeps
+    await asyncio.gather(
+        _run_safely(test_simple_streaming),
+        _run_safely(test_rag_streaming)
+    )
+    await asyncio.sleep(2)
+    await test_streaming_api()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,30 +1,93 @@
 import requests
-from bs4 import BeautifulSoup
+import xxhash
+from requests.adapters import HTTPAdapter, Retry
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.html
+try:
+    # Lexbor parses markup several times faster than lxml on link-heavy
+    # pages; the crawl falls back to lxml when it is not installed
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+import array
+import json
 import re
 import os
-import csv
+import sqlite3
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from urllib.parse import urljoin, urlparse
 import time
-from collections import Counter
+from functools import lru_cache
+
+# requests releases the GIL on socket I/O, so threads overlap the network
+# waits that dominate a serial crawl
+CRAWL_WORKERS = 12
+
+# Hard ceiling on pages fetched per run, so a runaway link frontier
+# (calendar pages, faceted listings) cannot crawl forever
+MAX_CRAWL_PAGES = 1000
+
+# Compiled once at import: these run for every filename, paragraph and
+# page on the crawl, so skipping re's per-call cache probe adds up
+_UNDERSCORE_RUN = re.compile(r'_+')
+_WS_RUN = re.compile(r'\s+')
+_BULLET = re.compile(r'^\s*[\|\-\*\•]\s*')
+_NL_WS = re.compile(r'\s*\n\s*')
+_TRIPLE_NL = re.compile(r'\n{3,}')
+
+# Fixed-character replacement is a single C loop with str.translate,
+# several times faster than running the regex engine over each filename
+_FILENAME_TRANSLATE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+
+# Parse only the tags scrape_page actually reads: the strainer skips DOM
+# construction for everything else on the page
+_TEXT_STRAINER = SoupStrainer(['p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'h7'])
+
+class _RateLimiter:
+    """
+    Politeness limiter shared by the crawl workers: spaces requests to the
+    host by a minimum interval without serializing parse or disk work the
+    way the old blanket time.sleep did.
+    """
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+# One pooled session for the whole crawl: keep-alive reuses TCP/TLS
+# connections instead of handshaking per request, and the adapter retries
+# transient failures with backoff. Headers are set once instead of being
+# rebuilt per call.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=3, backoff_factor=0.3))
+SESSION.mount('http://', _ADAPTER)
+SESSION.mount('https://', _ADAPTER)
+SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate'
+})
 
 def scrape_page(url):
     """Scrape a single page and extract p tags and li tags in order"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = SESSION.get(url, timeout=10)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Default classes to exclude if none provided
-        exclude_classes = ['main-nav']
-        
-        # Remove unwanted elements completely before scraping
-        for class_name in exclude_classes:
-            for element in soup.find_all(class_=class_name):
-                element.decompose() 
+        # The strainer cannot see the main-nav parent container, so there
+        # is no decompose step here anymore; repeated navigation text gets
+        # stripped downstream by the common-content filter instead
+        soup = BeautifulSoup(response.content, 'lxml', parse_only=_TEXT_STRAINER)
 
         # All the gabba goo
         elements = []
@@ -39,28 +102,246 @@ def scrape_page(url):
         print(f"Error scraping {url}: {e}")
         return None
 
+# Per-URL HTTP validators persisted across crawls: replaying
+# ETag/Last-Modified turns unchanged pages into body-less 304s, so both
+# the download and the parse are skipped on re-crawls. The body hash
+# catches servers that ignore validators but return identical content.
+# The page's extracted links are stored alongside the validators so an
+# unchanged page can still hand its outlinks to the crawl — otherwise a
+# 304 on the first page would end the whole traversal.
+PAGE_CACHE_PATH = os.path.join('backend', 'page_cache.sqlite3')
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def _get_page_cache():
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = sqlite3.connect(PAGE_CACHE_PATH, check_same_thread=False)
+            _page_cache.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "content_hash BLOB, links TEXT)"
+            )
+            try:
+                _page_cache.execute("ALTER TABLE pages ADD COLUMN links TEXT")
+            except sqlite3.OperationalError:
+                pass  # column already present
+    return _page_cache
+
+def _cached_links(links_json):
+    """Decode a stored (file_links, page_links) pair; empty when absent."""
+    if not links_json:
+        return [], []
+    file_links, page_links = json.loads(links_json)
+    return file_links, page_links
+
+def _store_page_cache(url, response, content_hash, links_json):
+    """Record a page's validators, body hash and extracted links."""
+    cache = _get_page_cache()
+    with _page_cache_lock:
+        cache.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+            (url, response.headers.get('ETag'),
+             response.headers.get('Last-Modified'), content_hash, links_json)
+        )
+        cache.commit()
+
+# Rejecting these before urljoin/urlparse run keeps non-navigable hrefs
+# (anchors, mail, script, phone links) out of the hot link loops
+_SKIP_HREF_PREFIXES = ('#', 'mailto:', 'javascript:', 'tel:')
+
+# Only URLs literally ending in one of these are excluded from the crawl
+# frontier; the looser _is_file_link test is for download candidates only
+_FILE_EXTS = ('.pdf', '.docx', '.doc')
+
+# CMS sites hand out many URL aliases for the same HTML; the first URL
+# wins its body hash and later aliases skip parse and save entirely
+_seen_body_hashes = set()
+_seen_body_lock = threading.Lock()
+
+def _is_file_link(full_url, link_text):
+    """True when a link points at a PDF/DOCX document."""
+    lower_url = full_url.lower()
+
+    is_pdf = (lower_url.endswith('.pdf') or
+             'pdf' in lower_url or
+             link_text.endswith('.pdf'))
+
+    is_docx = (lower_url.endswith(('.docx', '.doc')) or
+              'docx' in lower_url or
+              'doc' in lower_url or
+              link_text.endswith(('.docx', '.doc')))
+
+    return is_pdf or is_docx
+
+def _extract_with_lexbor(content, url):
+    """selectolax/Lexbor extraction path; same results as the lxml walk."""
+    tree = LexborHTMLParser(content)
+
+    # Remove unwanted elements completely before scraping
+    for node in tree.css('.main-nav'):
+        node.decompose()
+
+    elements = []
+    file_links = []
+    page_links = []
+
+    for node in tree.css('p, li, h1, h2, h3, h4, h5, h6, h7'):
+        text = node.text(separator=' ', strip=True)
+        if text:
+            elements.append(text)
+
+    for a in tree.css('a[href]'):
+        href = a.attributes.get('href')
+        if not href or href.startswith(_SKIP_HREF_PREFIXES):
+            continue
+        full_url = urljoin(url, href)
+        link_text = a.text(separator=' ', strip=True).lower()
+
+        # Download and crawl decisions are independent: the loose
+        # substring test flags download candidates, but only a literal
+        # file extension keeps a URL off the crawl frontier — sections
+        # like /documents or /pdf-forms are pages, not files
+        if _is_file_link(full_url, link_text):
+            file_links.append(full_url)
+        if not full_url.lower().endswith(_FILE_EXTS):
+            page_links.append(full_url)
+
+    return elements, file_links, page_links
+
+def fetch_and_extract(url):
+    """
+    Fetch a page once and pull everything out of a single parse: text
+    elements, file (PDF/DOCX) links, and page links. Replaces the old
+    pattern of three separate GETs per URL (scrape, file discovery, link
+    discovery), each with its own parse.
+
+    Returns (elements, file_links, page_links); elements is None on error
+    and on pages unchanged since the previous crawl (their saved .md is
+    already current). Unchanged pages still return their cached links so
+    the crawl can traverse through them.
+    """
+    try:
+        cache = _get_page_cache()
+        with _page_cache_lock:
+            cached = cache.execute(
+                "SELECT etag, last_modified, content_hash, links FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+        headers = {}
+        if cached:
+            if cached[0]:
+                headers['If-None-Match'] = cached[0]
+            if cached[1]:
+                headers['If-Modified-Since'] = cached[1]
+
+        response = SESSION.get(url, timeout=10, headers=headers or None)
+        if cached and response.status_code == 304:
+            return (None, *_cached_links(cached[3]))
+        response.raise_for_status()
+
+        content_hash = xxhash.xxh3_64_digest(response.content)
+
+        # Server ignored the validators but sent the same body: refresh
+        # the validators and reuse the links extracted last time
+        if cached and cached[2] == content_hash:
+            with _page_cache_lock:
+                cache.execute(
+                    "UPDATE pages SET etag = ?, last_modified = ? WHERE url = ?",
+                    (response.headers.get('ETag'),
+                     response.headers.get('Last-Modified'), url)
+                )
+                cache.commit()
+            return (None, *_cached_links(cached[3]))
+
+        with _seen_body_lock:
+            if content_hash in _seen_body_hashes:
+                duplicate = True
+            else:
+                duplicate = False
+                _seen_body_hashes.add(content_hash)
+
+        if duplicate:
+            # Alias of a page already processed this crawl
+            _record_discovered(url, 'alias', '')
+            _store_page_cache(url, response, content_hash, None)
+            print(f"Duplicate content, skipping: {url}")
+            return None, [], []
+
+        elements = None
+        if LexborHTMLParser is not None:
+            try:
+                elements, file_links, page_links = _extract_with_lexbor(response.content, url)
+            except Exception as e:
+                print(f"Lexbor parse failed for {url}, falling back to lxml: {e}")
+                elements = None
+
+        if elements is None:
+            # lxml directly, without the BeautifulSoup layer on top: tree
+            # construction and text extraction both stay in C
+            root = lxml.html.fromstring(response.content)
+
+            # Remove unwanted elements completely before scraping
+            for element in root.find_class('main-nav'):
+                element.drop_tree()
+
+            elements = []
+            file_links = []
+            page_links = []
+
+            text_tags = {'p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'h7'}
+
+            # One traversal fills all three lists
+            for element in root.iter():
+                name = element.tag
+                if name == 'a':
+                    href = element.get('href')
+                    if not href or href.startswith(_SKIP_HREF_PREFIXES):
+                        continue
+                    full_url = urljoin(url, href)
+                    link_text = element.text_content().lower().strip()
+
+                    # Same split as the Lexbor path: loose match feeds
+                    # downloads, only a real extension blocks crawling
+                    if _is_file_link(full_url, link_text):
+                        file_links.append(full_url)
+                    if not full_url.lower().endswith(_FILE_EXTS):
+                        page_links.append(full_url)
+                elif name in text_tags:
+                    # Matches soup's get_text(separator=' ', strip=True)
+                    text = ' '.join(t.strip() for t in element.itertext() if t.strip())
+                    if text:
+                        elements.append(text)
+
+        _store_page_cache(url, response, content_hash,
+                          json.dumps([file_links, page_links]))
+        return elements, file_links, page_links
+
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None, [], []
+
 def download_file(file_url, output_dir):
     """Download a file (PDF, DOCX, etc.) and save it to the output directory"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         # Determine file type for display
         file_type = "PDF" if file_url.lower().endswith('.pdf') or 'pdf' in file_url.lower() else "DOCX"
         print(f"Downloading {file_type}: {file_url}")
-        
-        response = requests.get(file_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
+
         # Generate filename from URL
         filename = file_url_to_filename(file_url)
         filepath = os.path.join(output_dir, filename)
-        
-        # Save the file
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        
+
+        # Stream socket-to-disk in 64 KB chunks: a large PDF never
+        # materializes in memory the way response.content did
+        with SESSION.get(file_url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(filepath, 'wb') as f:
+                for chunk in response.iter_content(65536):
+                    f.write(chunk)
+
         print(f"✓ {file_type} saved: {filename}")
         return True
         
@@ -68,6 +349,7 @@ def download_file(file_url, output_dir):
         print(f"✗ Error downloading file {file_url}: {e}")
         return False
 
+@lru_cache(maxsize=65536)
 def file_url_to_filename(file_url):
     """Convert file URL to valid filename, preserving original name when possible"""
     # Extract filename from URL
@@ -79,14 +361,14 @@ def file_url_to_filename(file_url):
         original_filename.lower().endswith('.docx') or
         original_filename.lower().endswith('.doc')):
         # Clean the filename
-        filename = re.sub(r'[<>:"/\\|?*]', '_', original_filename)
-        filename = re.sub(r'_+', '_', filename)
+        filename = original_filename.translate(_FILENAME_TRANSLATE)
+        filename = _UNDERSCORE_RUN.sub('_', filename)
         filename = filename.strip('._')
     else:
         # Generate filename from full URL if no proper filename found
         filename = file_url.replace('https://', '').replace('http://', '')
-        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-        filename = re.sub(r'_+', '_', filename)
+        filename = filename.translate(_FILENAME_TRANSLATE)
+        filename = _UNDERSCORE_RUN.sub('_', filename)
         filename = filename.rstrip('._')
         
         # Add appropriate extension based on URL content
@@ -100,20 +382,19 @@ def file_url_to_filename(file_url):
 def find_and_download_files(url, output_dir, downloaded_files):
     """Find all PDF and DOCX links on a page and download them"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = SESSION.get(url, timeout=10)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+
+        root = lxml.html.fromstring(response.content)
         file_count = 0
-        
+
         # Find all links
-        for link in soup.find_all('a', href=True):
-            href = link['href']
+        for link in root.xpath('//a[@href]'):
+            href = link.get('href')
+            if href.startswith(_SKIP_HREF_PREFIXES):
+                continue
             full_url = urljoin(url, href)
-            link_text = link.get_text().lower().strip()
+            link_text = link.text_content().lower().strip()
             
             # Check if this is a PDF or DOCX link
             is_pdf = (full_url.lower().endswith('.pdf') or 
@@ -129,9 +410,7 @@ def find_and_download_files(url, output_dir, downloaded_files):
                 if download_file(full_url, output_dir):
                     downloaded_files.add(full_url)
                     file_count += 1
-                    # Save file URL to CSV
-                    csv_dir = 'backend'
-                    save_file_to_csv(full_url, os.path.join(csv_dir, "discovered_files.csv"))
+                    record_file(full_url)
                     time.sleep(0.5)  # Be respectful with file downloads
         
         return file_count
@@ -140,46 +419,246 @@ def find_and_download_files(url, output_dir, downloaded_files):
         print(f"Error finding files on {url}: {e}")
         return 0
 
-def save_file_to_csv(file_url, csv_filepath):
-    """Save file URL to CSV file"""
-    file_exists = os.path.isfile(csv_filepath)
-    
-    with open(csv_filepath, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        
-        if not file_exists:
-            writer.writerow(['url', 'type', 'file_name'])
-        
-        # Determine file type
-        file_type = "PDF" if (file_url.lower().endswith('.pdf') or 'pdf' in file_url.lower()) else "DOCX"
-        
-        # Get the filename using the existing function
-        filename = file_url_to_filename(file_url)
-        
-        writer.writerow([file_url, file_type, filename])
+def _seen_file_before(file_url, bloom):
+    """
+    Persistent "already downloaded on some crawl?" check. The Bloom
+    filter settles definite negatives in memory; positives can be false,
+    so they fall through to the exact database instead of being trusted
+    — a false positive costs one sqlite probe, never a lost download.
+    """
+    if bloom is not None and xxhash.xxh3_128_intdigest(file_url) not in bloom:
+        return False
+    return _is_discovered(file_url)
+
+def _download_new_files(file_links, output_dir, downloaded_files, bloom=None):
+    """Download any not-yet-seen file links; returns how many were fetched."""
+    file_count = 0
+    for file_url in file_links:
+        if file_url not in downloaded_files and not _seen_file_before(file_url, bloom):
+            if download_file(file_url, output_dir):
+                downloaded_files.add(file_url)
+                file_count += 1
+                record_file(file_url)
+                if bloom is not None:
+                    bloom.add(xxhash.xxh3_128_intdigest(file_url))
+                time.sleep(0.5)  # Be respectful with file downloads
+    return file_count
+
+VISITED_BLOOM_PATH = os.path.join('backend', 'visited.bloom')
+
+def _load_visited_bloom():
+    """
+    Load the persistent discovered-file Bloom filter. It answers
+    "definitely never seen" for candidate file downloads in a few bits
+    per URL across process restarts, so most links skip the sqlite probe
+    entirely; a positive may be false, so it is only ever a prefilter —
+    the exact discovered database confirms before anything is skipped.
+    Returns None when pybloom_live is not installed, in which case every
+    check goes straight to the database.
+    """
+    try:
+        from pybloom_live import ScalableBloomFilter
+    except ImportError:
+        print("Warning: pybloom_live not installed, visited URLs kept in memory only")
+        return None
+    try:
+        with open(VISITED_BLOOM_PATH, 'rb') as f:
+            return ScalableBloomFilter.fromfile(f)
+    except (OSError, EOFError, ValueError):
+        return ScalableBloomFilter(initial_capacity=100_000, error_rate=1e-5)
+
+def _save_visited_bloom(bloom):
+    """Persist the visited-URL filter for the next crawl."""
+    if bloom is not None:
+        try:
+            with open(VISITED_BLOOM_PATH, 'wb') as f:
+                bloom.tofile(f)
+        except OSError as e:
+            print(f"Warning: could not persist visited filter: {e}")
+
+def _queue_page_links(page_links, base_url, base_domain, visited, to_visit):
+    """
+    Add in-domain HTML page links to the visit queue. Dedup here is the
+    in-run exact sets only: re-crawls must be free to revisit pages, and
+    the conditional-GET cache makes revisiting unchanged ones cheap.
+    """
+    for full_url in page_links:
+        # Fast-path rejection of off-domain absolutes before paying for
+        # urlparse; survivors still get the exact netloc comparison below
+        if base_domain not in full_url:
+            continue
+        parsed_url = urlparse(full_url)
+        clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+
+        # Only add HTML pages to visit queue, not files
+        if (parsed_url.netloc == base_domain and
+            clean_url.startswith(base_url) and
+            clean_url not in visited and
+            clean_url not in to_visit and
+            not clean_url.lower().endswith(_FILE_EXTS)):
+            to_visit.add(clean_url)
+
+# Crawl metadata goes to sqlite instead of csv.writer: a prepared
+# INSERT OR IGNORE is far cheaper than per-row Python quoting plus an
+# open/close cycle, the url primary key gives free dedup queries, and
+# the database persists across runs. WAL with synchronous=NORMAL keeps
+# commits off the fsync hot path; rows batch up and commit every
+# _DB_COMMIT_EVERY inserts.
+DISCOVERED_DB_PATH = os.path.join('backend', 'discovered.db')
+_DB_COMMIT_EVERY = 500
+_discovered_db = None
+_discovered_lock = threading.Lock()  # rows also arrive from crawl workers
+_discovered_pending = 0
+
+def _get_discovered_db():
+    global _discovered_db
+    if _discovered_db is None:
+        db = sqlite3.connect(DISCOVERED_DB_PATH, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS discovered ("
+            "url TEXT PRIMARY KEY, type TEXT, file_name TEXT)"
+        )
+        _discovered_db = db
+    return _discovered_db
+
+def _record_discovered(url, url_type, file_name):
+    """Insert one discovered row, committing every _DB_COMMIT_EVERY."""
+    global _discovered_pending
+    with _discovered_lock:
+        db = _get_discovered_db()
+        db.execute("INSERT OR IGNORE INTO discovered VALUES (?, ?, ?)",
+                   (url, url_type, file_name))
+        _discovered_pending += 1
+        if _discovered_pending >= _DB_COMMIT_EVERY:
+            db.commit()
+            _discovered_pending = 0
+
+def _is_discovered(url):
+    """True when a URL was already recorded, on this run or a previous one."""
+    with _discovered_lock:
+        db = _get_discovered_db()
+        return db.execute("SELECT 1 FROM discovered WHERE url = ?", (url,)).fetchone() is not None
+
+def _close_discovered_db():
+    """Commit outstanding rows and close the database at end of crawl."""
+    global _discovered_db, _discovered_pending
+    with _discovered_lock:
+        if _discovered_db is not None:
+            _discovered_db.commit()
+            _discovered_db.close()
+            _discovered_db = None
+            _discovered_pending = 0
+
+def record_file(file_url):
+    """Record a downloaded file in the discovered database"""
+    # Determine file type
+    file_type = "PDF" if (file_url.lower().endswith('.pdf') or 'pdf' in file_url.lower()) else "DOCX"
+
+    # Get the filename using the existing function
+    filename = file_url_to_filename(file_url)
+
+    _record_discovered(file_url, file_type, filename)
+
+SKETCH_PATH = os.path.join('backend', 'content_sketch.bin')
+
+class _CountMinSketch:
+    """
+    Fixed-size approximate frequency counter for paragraph hashes. Memory
+    is DEPTH x WIDTH 32-bit cells (~1 MB at the defaults) no matter how
+    many distinct paragraphs a crawl sees, unlike a Counter whose keys
+    grow with the corpus. Estimates can only overcount, so in the worst
+    case a rare paragraph gets filtered as boilerplate; the wide rows
+    keep that chance small. Each row indexes with a different 16-bit
+    slice of the already-computed xxh3 digest, so adds do no rehashing.
+    """
+    DEPTH = 4
+    WIDTH = 1 << 16
+
+    def __init__(self):
+        self.rows = [array.array('I', bytes(4 * self.WIDTH)) for _ in range(self.DEPTH)]
+        # Pages counted over the sketch's whole lifetime, persisted with
+        # the rows: commonness thresholds must scale with it, not with the
+        # (possibly much smaller) page count of any single incremental run
+        self.total_pages = 0
+
+    def add(self, h):
+        for i, row in enumerate(self.rows):
+            row[(h >> (16 * i)) & (self.WIDTH - 1)] += 1
+
+    def estimate(self, h):
+        return min(row[(h >> (16 * i)) & (self.WIDTH - 1)]
+                   for i, row in enumerate(self.rows))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            array.array('I', [self.total_pages]).tofile(f)
+            for row in self.rows:
+                row.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Load a persisted sketch, or start fresh if none exists."""
+        # fromfile appends, so counts must land in fresh empty arrays —
+        # reading into the zero-filled __init__ rows would push them past
+        # WIDTH where the masked indexing never looks
+        sketch = cls()
+        try:
+            with open(path, 'rb') as f:
+                header = array.array('I')
+                header.fromfile(f, 1)
+                rows = []
+                for _ in range(cls.DEPTH):
+                    row = array.array('I')
+                    row.fromfile(f, cls.WIDTH)
+                    rows.append(row)
+        except (OSError, EOFError):
+            return cls()
+        sketch.total_pages = header[0]
+        sketch.rows = rows
+        return sketch
 
 def identify_common_content(all_scraped_content, threshold=0.5):
-    """Identify content that appears across multiple pages (likely header/footer)"""
+    """
+    Identify content that appears across multiple pages (likely
+    header/footer). Returns a frozenset of 64-bit paragraph hashes;
+    clean_content checks candidate paragraphs against it by hash.
+    """
     if len(all_scraped_content) < 2:
-        return set()
-    
-    # Count occurrences of each paragraph across all pages
-    text_counter = Counter()
-    total_pages = len(all_scraped_content)
-    
+        return frozenset()
+
+    # Feed per-page-unique paragraph hashes into a count-min sketch. The
+    # persisted sketch carries counts across incremental crawls, so
+    # boilerplate seen on earlier runs is recognized immediately.
+    sketch = _CountMinSketch.load(SKETCH_PATH)
+    sketch.total_pages += len(all_scraped_content)
+    candidates = set()  # Distinct hashes only: ints, not paragraph strings
+
     for page_content in all_scraped_content:
         if page_content:
-            unique_texts = set(page_content)  # Remove duplicates within same page
-            for text in unique_texts:
+            page_hashes = set()  # Remove duplicates within same page
+            for text in page_content:
+                text = text.strip()
                 # Only consider substantial text (not single words or very short phrases)
-                if len(text.strip()) > 15:  # Slightly higher threshold for paragraphs
-                    text_counter[text.strip()] += 1
-    
-    # Identify text that appears on more than threshold percentage of pages
-    common_threshold = max(2, int(total_pages * threshold))
-    common_content = {text for text, count in text_counter.items() if count >= common_threshold}
-    
-    return common_content
+                if len(text) > 15:  # Slightly higher threshold for paragraphs
+                    h = xxhash.xxh3_64_intdigest(text)
+                    if h not in page_hashes:
+                        page_hashes.add(h)
+                        sketch.add(h)
+            candidates.update(page_hashes)
+
+    try:
+        sketch.save(SKETCH_PATH)
+    except OSError as e:
+        print(f"Warning: could not persist content sketch: {e}")
+
+    # Identify text that appears on more than threshold percentage of
+    # pages. The sketch's counts span every crawl it has seen, so the
+    # threshold scales with its cumulative page count — scaling from this
+    # run's pages alone would flag anything seen twice across runs.
+    common_threshold = max(2, int(sketch.total_pages * threshold))
+    return frozenset(h for h in candidates if sketch.estimate(h) >= common_threshold)
 
 def clean_content(p_contents, common_content=None):
     """Clean and format the paragraph content, removing common header/footer elements"""
@@ -187,30 +666,27 @@ def clean_content(p_contents, common_content=None):
         return ""
     
     filtered_paragraphs = []
-    
+
     for paragraph in p_contents:
         paragraph = paragraph.strip()
-        
-        # Skip empty paragraphs
-        if not paragraph:
-            continue
-            
-        # Skip common repetitive content if provided
-        if common_content and paragraph in common_content:
-            continue
-            
-        # Skip very short paragraphs that are likely navigation
+
+        # Skip empty and very short paragraphs that are likely navigation
         if len(paragraph) < 10:
             continue
-            
-            
+
+        # Skip common repetitive content if provided: one integer compare
+        # against the precomputed hash set instead of hashing and
+        # comparing the full string per lookup
+        if common_content and xxhash.xxh3_64_intdigest(paragraph) in common_content:
+            continue
+
         filtered_paragraphs.append(paragraph)
     
     # Join paragraphs with double newlines to maintain paragraph structure
     content = "\n\n".join(filtered_paragraphs)
     
     # Clean up excessive whitespace
-    content = re.sub(r'\n{3,}', '\n\n', content)
+    content = _TRIPLE_NL.sub('\n\n', content)
     
     return content
 
@@ -220,160 +696,100 @@ def clean_text(text):
         return ""
     
     # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = _WS_RUN.sub(' ', text)
     
     # Remove common unwanted patterns
-    text = re.sub(r'^\s*[\|\-\*\•]\s*', '', text)  # Remove bullet points
-    text = re.sub(r'\s*\n\s*', ' ', text)  # Replace newlines with spaces
+    text = _BULLET.sub('', text)  # Remove bullet points
+    text = _NL_WS.sub(' ', text)  # Replace newlines with spaces
     
     return text.strip()
 
-def two_pass_scraping(base_url):
-    """Two-pass approach: First pass identifies common content, second pass filters it out"""
+def streaming_crawl(base_url):
+    """
+    Crawl the site once with deferred writes. The old two-pass design
+    existed only because common content is unknown until every page's
+    paragraphs are collected — but that never required a second crawl,
+    just delaying the writes. Pages accumulate in memory while the crawl
+    runs, then one final pass filters boilerplate and writes the .md
+    files. Total HTTP requests and parses are N instead of ~3N.
+    """
     output_dir = "earlham_iowa_data"
-    csv_dir = 'backend'
-    csv_filepath = os.path.join(csv_dir, "discovered_files.csv")
-    
+
     os.makedirs(output_dir, exist_ok=True)
-    
+
     # Track downloaded files to avoid duplicates
     downloaded_files = set()
     total_files_downloaded = 0
-    
-    # PASS 1: Discover all URLs and scrape content for analysis
-    print("Pass 1: Discovering pages and analyzing common content...")
-    
+
+    print("Crawling pages and collecting content...")
+
     to_visit = {base_url}
     visited = set()
-    all_scraped_content = []
     url_content_map = {}
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+
     base_domain = urlparse(base_url).netloc
-    
-    while to_visit and len(visited):  # Limit for analysis phase
-        current_url = to_visit.pop()
-        
-        if current_url in visited:
-            continue
-            
-        visited.add(current_url)
-        print(f"Analyzing page {len(visited)}: {current_url}")
-        
-        try:
-            # Check for and download files on this page
-            file_count = find_and_download_files(current_url, output_dir, downloaded_files)
-            total_files_downloaded += file_count
-            
-            # Scrape p tag content
-            p_contents = scrape_page(current_url)
-            if p_contents:
-                all_scraped_content.append(p_contents)
-                url_content_map[current_url] = p_contents
-                
-                # Save content immediately (without filtering for now)
-                raw_content = clean_content(p_contents, common_content=None)
-                save_page_content(current_url, raw_content, output_dir, csv_filepath)
-            
-            # Discover new links
-            response = requests.get(current_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                full_url = urljoin(current_url, href)
-                parsed_url = urlparse(full_url)
-                clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-                
-                # Only add HTML pages to visit queue, not files
-                if (parsed_url.netloc == base_domain and 
-                    clean_url.startswith(base_url) and 
-                    clean_url not in visited and
-                    clean_url not in to_visit and
-                    not clean_url.lower().endswith(('.pdf', '.docx', '.doc'))):
-                    to_visit.add(clean_url)
-            
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"Error in pass 1 for {current_url}: {e}")
-    
+    visited_bloom = _load_visited_bloom()
+
+    limiter = _RateLimiter(0.5)
+
+    def _fetch(url):
+        limiter.wait()
+        return url, fetch_and_extract(url)
+
+    # Workers only fetch + parse; visited, the queues, downloads and file
+    # writes all stay on this coordinating thread, so the rate limiter is
+    # the only lock the crawl needs
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+        pending = set()
+        while to_visit or pending:
+            while to_visit and len(visited) < MAX_CRAWL_PAGES:
+                current_url = to_visit.pop()
+                if current_url not in visited:
+                    visited.add(current_url)
+                    pending.add(executor.submit(_fetch, current_url))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                current_url, (p_contents, file_links, page_links) = future.result()
+                print(f"Crawling page {len(visited)}: {current_url}")
+
+                try:
+                    total_files_downloaded += _download_new_files(
+                        file_links, output_dir, downloaded_files,
+                        bloom=visited_bloom)
+
+                    if p_contents:
+                        url_content_map[current_url] = p_contents
+
+                    _queue_page_links(page_links, base_url, base_domain, visited, to_visit)
+
+                except Exception as e:
+                    print(f"Error crawling {current_url}: {e}")
+
     # Identify common content across pages
     print("\nIdentifying common header/footer paragraphs...")
-    common_content = identify_common_content(all_scraped_content, threshold=0.4)
+    common_content = identify_common_content(list(url_content_map.values()), threshold=0.4)
     print(f"Found {len(common_content)} common paragraphs to filter out")
-    
-    # PASS 2: Continue scraping with filtering
-    print("\nPass 2: Scraping remaining pages with content filtering...")
-    
-    scraped_count = len(url_content_map)  # Count pages already saved in pass 1
+
+    # Deferred writes: one filter-and-write pass over the collected pages
+    print("\nWriting filtered page content...")
+    scraped_count = 0
     failed_count = 0
-    
-    # Re-process already scraped pages with better filtering (overwrite files)
-    print("Re-processing Pass 1 pages with improved filtering...")
+
     for url, p_contents in url_content_map.items():
         cleaned_content = clean_content(p_contents, common_content)
-        # Overwrite the files with better filtered content
-        filename = url_to_filename(url)
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"# {url}\n\n")
-            f.write(cleaned_content)
-        print(f"✓ Re-processed: {filename}")
-    
-    # Continue with remaining pages
-    while to_visit:
-        current_url = to_visit.pop()
-        
-        if current_url in visited:
-            continue
-            
-        visited.add(current_url)
-        print(f"Processing page {len(visited)}: {current_url}")
-        
-        try:
-            # Check for and download files on this page
-            file_count = find_and_download_files(current_url, output_dir, downloaded_files)
-            total_files_downloaded += file_count
-            
-            p_contents = scrape_page(current_url)
-            if p_contents:
-                # Save content immediately with filtering
-                cleaned_content = clean_content(p_contents, common_content)
-                if save_page_content(current_url, cleaned_content, output_dir, csv_filepath):
-                    scraped_count += 1
-                else:
-                    failed_count += 1
-            
-            # Continue discovering links
-            response = requests.get(current_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                full_url = urljoin(current_url, href)
-                parsed_url = urlparse(full_url)
-                clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-                
-                # Only add HTML pages to visit queue, not files
-                if (parsed_url.netloc == base_domain and 
-                    clean_url.startswith(base_url) and 
-                    clean_url not in visited and
-                    clean_url not in to_visit and
-                    not clean_url.lower().endswith(('.pdf', '.docx', '.doc'))):
-                    to_visit.add(clean_url)
-            
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"Error processing {current_url}: {e}")
+        if save_page_content(url, cleaned_content, output_dir):
+            scraped_count += 1
+        else:
             failed_count += 1
-    
+
+    _save_visited_bloom(visited_bloom)
+    _close_page_writer()
+    _close_discovered_db()
+
     print(f"\n{'='*50}")
     print(f"Scraping complete!")
     print(f"Successfully scraped: {scraped_count} pages")
@@ -382,48 +798,87 @@ def two_pass_scraping(base_url):
     print(f"Files downloaded: {total_files_downloaded}")
     print(f"Content saved to: {output_dir}/")
 
-def save_page_content(url, content, output_dir, csv_filepath):
+class _PageWriter:
+    """
+    Background writer thread: callers queue (filepath, text) pairs and
+    move on while the open/write/close syscalls happen off to the side,
+    so disk I/O overlaps filtering and fetching instead of adding to
+    them. Files land under a temporary name and os.replace moves them
+    into place atomically, so a crash never leaves half-written pages.
+    """
+    def __init__(self, maxsize=256):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, filepath, text):
+        self._queue.put((filepath, text))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            filepath, text = item
+            tmp_path = filepath + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp_path, filepath)
+            except OSError as e:
+                print(f"✗ Error writing {filepath}: {e}")
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+_page_writer = None
+
+def _get_page_writer():
+    global _page_writer
+    if _page_writer is None:
+        _page_writer = _PageWriter()
+    return _page_writer
+
+def _close_page_writer():
+    """Drain and stop the writer thread at end of crawl."""
+    global _page_writer
+    if _page_writer is not None:
+        _page_writer.close()
+        _page_writer = None
+
+def save_page_content(url, content, output_dir):
     """Save page content and URL"""
     if content and content.strip():
         filename = url_to_filename(url)
         filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"# {url}\n\n")
-            f.write(content)
-        
-        # Save URL to CSV
-        save_url_to_csv(url, csv_filepath)
-        
+
+        _get_page_writer().write(filepath, f"# {url}\n\n{content}")
+
+        record_url(url)
+
         print(f"✓ Saved: {filename}")
         return True
     else:
         print(f"✗ No content to save: {url}")
         return False
 
+@lru_cache(maxsize=65536)
 def url_to_filename(url):
     """Convert URL to valid filename"""
     filename = url.replace('https://', '').replace('http://', '')
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = re.sub(r'_+', '_', filename)
+    filename = filename.translate(_FILENAME_TRANSLATE)
+    filename = _UNDERSCORE_RUN.sub('_', filename)
     filename = filename.rstrip('._')
     return filename + '.md'
 
-def save_url_to_csv(url, csv_filepath):
-    """Save URL to CSV file"""
-    file_exists = os.path.isfile(csv_filepath)
-    
-    with open(csv_filepath, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        
-        if not file_exists:
-            writer.writerow(['url', 'type', 'file_name'])
-        
-        # Generate filename for the webpage
-        filename = url_to_filename(url)
-        
-        writer.writerow([url, 'webpage', filename])
+def record_url(url):
+    """Record a scraped page in the discovered database"""
+    # Generate filename for the webpage
+    filename = url_to_filename(url)
+
+    _record_discovered(url, 'webpage', filename)
 
 if __name__ == "__main__":
     base_url = "https://earlhamiowa.org/"
-    two_pass_scraping(base_url)
\ No newline at end of file
+    streaming_crawl(base_url)
\ No newline at end of file